@@ -1,20 +1,50 @@
 import os
 import sys
 import argparse
+import configparser
 
-import logging
 import pyodbc
-import time
+from fusion_bridge import FusionBridge, accion, ejecutar_accion, ejecutar_daemon, ACCIONES as ACCIONES_COMUNES
+from dataclasses import asdict, dataclass
 from datetime import datetime
-try:
-    import clr  # pythonnet
-except ImportError:
-    raise ImportError("pythonnet debe estar instalado en el entorno. Instala con: pip install pythonnet")
 
-class FusionBridge:
+INSERT_COMPROBANTE_SQL = """
+    INSERT INTO fusion_comprobantes (
+        venta_id, surtidor_id, pico_id, litros, importe, precio_unitario, tipo_pago,
+        litros_inicial, litros_final, nivel_precio, tipo_transaccion, importe_preset,
+        turno_id, producto_id, producto_nombre, fecha, hora
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+# Ventas por executemany en procesar_ventas_recibidas
+LOTE_INSERT = 500
+
+@dataclass(slots=True)
+class Venta:
+    # Venta leída del Fusion tal como se graba en fusion_comprobantes
+    venta_id: object
+    surtidor_id: object
+    pump_id: object
+    pico_id: object
+    producto_id: object
+    volumen: object
+    importe: object
+    precio_unitario: object
+    tipo_pago: object
+    fecha: object
+    hora: object
+    volumen_inicial: object
+    volumen_final: object
+    nivel_precio: object
+    tipo_transaccion: object
+    importe_preset: object
+    turno_id: object
+    producto: object
+    nombre_producto: object
+
+class FusionBridgeSybase(FusionBridge):
+    # Variante que graba las ventas leídas del Fusion en la base Sybase (fusion_comprobantes)
     def __init__(self, dll_path):
         # Forzar que el config.ini se busque en el mismo directorio que bridge.py
-        import configparser
         config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini')
         if not os.path.exists(config_path):
             raise FileNotFoundError(f"No se encontró config.ini en {config_path}")
@@ -30,246 +60,148 @@ class FusionBridge:
             raise Exception("Faltan datos de conexión en config.ini (serv, usr, passwd, db)")
         # Construir cadena de conexión Sybase (ajusta según tu driver/DSN)
         conn_str = f"DSN={serv};UID={usr};PWD={passwd};DATABASE={db}"
-        import pyodbc
         self.conn = pyodbc.connect(conn_str)
-        # Usar AddReference solo si está disponible
-        if hasattr(clr, 'AddReference'):
-            clr.AddReference(dll_path)
-        else:
-            raise ImportError("No se encontró 'AddReference' en clr. Actualiza pythonnet >= 3.x y elimina cualquier archivo clr.py local.")
-        import importlib
-        fusion_mod = importlib.import_module('FusionClass')
-        self.Fusion = getattr(fusion_mod, 'Fusion')
-        self.FusionSale = getattr(fusion_mod, 'FusionSale')
-        self.fusion = self.Fusion()
-
-    def conectar(self, ip):
-        self.fusion.Connection(ip)
-        time.sleep(2)
+        self.fast_executemany = config.getboolean('CONEXION', 'fast_executemany', fallback=False)
+        super().__init__(dll_path)
 
-    def leer_producto(self, grado):
-        nombre_temp = ""
-        exito, nombre_res = self.fusion.GetGrade(grado, nombre_temp)
-        if exito:
-            return nombre_res
-        else:
-            return None
+    def campos_venta(self, venta):
+        return asdict(venta).items()
 
-    def listar_metodos(self):
-        print("\n--- Métodos públicos de Fusion ---")
-        for method in dir(self.fusion):
-            if not method.startswith('_'):
-                print(method)
-        print("--- Fin de métodos ---\n")
+    def _armar_venta_desde_sale(self):
+        leer_producto = self.leer_producto
 
-    def obtener_venta(self, hose_id, sale_number=None, ejecucion_id=None):
-        #self.imprimir_firma_getsale()
-        sale_data = self.FusionSale()
-        # Si se pasa sale_number, setearlo en el objeto sale_data antes de llamar a GetSale
-        if sale_number is not None:
-            if hasattr(sale_data, 'SaleNumber'):
-                sale_data.SaleNumber = sale_number
-        exito = self.fusion.GetSale(hose_id, sale_data)
-        if exito:
+        def venta_desde_sale(sale_data):
+            # Arma la Venta a partir de un FusionSale ya completado por GetSale/GetLastSale
             try:
-                venta = {
-                    'venta_id': sale_data.GetSaleID(),
-                    'surtidor_id': sale_data.GetPumpNr(),
-                    'pump_id': sale_data.GetPumpNr(),  # Agregado pump_id
-                    'pico_id': sale_data.GetHoseNr(),
-                    'producto_id': sale_data.GetGradeNr(),
-                    'volumen': sale_data.GetVolume(),
-                    'importe': sale_data.GetAmount(),
-                    'precio_unitario': sale_data.GetPPU(),
-                    'tipo_pago': sale_data.GetPaymentType(),
-                    'fecha': sale_data.GetDateOfTransaction(),
-                    'hora': sale_data.GetTimeOfTransaction(),
-                    'volumen_inicial': sale_data.GetInitialVolume(),
-                    'volumen_final': sale_data.GetFinalVolume(),
-                    'nivel_precio': sale_data.GetPriceLevel(),
-                    'tipo_transaccion': sale_data.GetTypeOfTransaction(),
-                    'importe_preset': sale_data.GetPresetAmount(),
-                    'turno_id': sale_data.GetShiftID(),
-                    'producto': sale_data.GetGradeNr(),
-                    'nombre_producto': self.leer_producto(sale_data.GetGradeNr()),
-                }
+                # Cada Get*() cruza a .NET: bomba y grado se leen una sola vez y se reutilizan
+                surtidor_id = sale_data.GetPumpNr()
+                producto_id = sale_data.GetGradeNr()
+                venta = Venta(
+                    venta_id=sale_data.GetSaleID(),
+                    surtidor_id=surtidor_id,
+                    pump_id=surtidor_id,  # Agregado pump_id
+                    pico_id=sale_data.GetHoseNr(),
+                    producto_id=producto_id,
+                    volumen=sale_data.GetVolume(),
+                    importe=sale_data.GetAmount(),
+                    precio_unitario=sale_data.GetPPU(),
+                    tipo_pago=sale_data.GetPaymentType(),
+                    fecha=sale_data.GetDateOfTransaction(),
+                    hora=sale_data.GetTimeOfTransaction(),
+                    volumen_inicial=sale_data.GetInitialVolume(),
+                    volumen_final=sale_data.GetFinalVolume(),
+                    nivel_precio=sale_data.GetPriceLevel(),
+                    tipo_transaccion=sale_data.GetTypeOfTransaction(),
+                    importe_preset=sale_data.GetPresetAmount(),
+                    turno_id=sale_data.GetShiftID(),
+                    producto=producto_id,
+                    nombre_producto=leer_producto(producto_id),
+                )
             except Exception as e:
-                venta = {'error': f'Error extrayendo datos de la venta: {e}'}
+                print(f"Error extrayendo datos de la venta: {e}")
+                return None
             return venta
-        else:
-            return None
-
-    def obtener_picos(self):
-        hoses = []
-        try:
-            config = self.fusion.GetConfig()
-            print("Atributos de FusionForecourt (GetConfig()):", dir(config))
-            # Aquí puedes ajustar el nombre correcto según lo que imprima
-            # for pump in config.Pumps:
-            #     for hose in pump.Hoses:
-            #         hoses.append(hose.HoseNr)
-        except Exception as e:
-            print(f"Error obteniendo hoses: {e}")
-        return hoses
+        return venta_desde_sale
 
     def obtener_ventas_del_dia(self, hose_id, fecha_dia, ejecucion_id=None):
         print(":: Obteniendo ventas del día ", fecha_dia, ", aguarde un momento por favor...")
-        if isinstance(fecha_dia, str):
-            fecha_dia = datetime.strptime(fecha_dia, "%Y-%m-%d").date()
-        ventas = []
-        ventas_ids = set()  # Para evitar duplicados, solo por venta_id (SaleID)
-        hose_ids = []
-        try:
-            """
-            # esto no deveulve bien las coss lo comento temporalmente para seguir adelante, pero es importante entender la estructura real de la config y como acceder a bombas y picos reales
-            config = self.fusion.GetConfig()
-            n_bombas = getattr(config, 'm_iPumps', 0)
-            o_pump = getattr(config, 'o_Pump', None)
-            if o_pump is not None and n_bombas:
-                # Recorrer todas las bombas y sus picos reales
-                for idx in range(n_bombas):
-                    pump = o_pump[idx]
-                    pump_id = getattr(pump, 'm_iPumpNr', None)
-                    hoses = getattr(pump, 'o_Hose', None)
-                    n_hoses = getattr(pump, 'm_iHoses', 0)
-                    if hoses is not None and n_hoses:
-                        for hidx in range(n_hoses):
-                            hose = hoses[hidx]
-                            hose_id_real = getattr(hose, 'm_iHoseNr', None)
-                            if pump_id is not None and hose_id_real is not None:
-                                hose_ids.append((pump_id, hose_id_real))
-            else:
-                # Fallback si no se puede obtener la config real
-                hose_ids = [(None, i) for i in range(1, 22)]
-            """
-            hose_ids = [(None, i) for i in range(1, 22)]
-        except Exception as e:
-            print(f"Error obteniendo configuración de bombas y picos: {e}")
-            hose_ids = [(None, i) for i in range(1, 22)]
-
-        if hose_id and int(hose_id) > 0:
-            hose_ids = [hid for hid in hose_ids if hid[1] == int(hose_id)]
-        if not hose_ids:
-            hose_ids = [(None, int(hose_id))] if hose_id and int(hose_id) > 0 else [(None, i) for i in range(1, 22)]
-
-        for pump_id, pico_id in hose_ids:
-            sale_data = self.FusionSale()
-            exito = self.fusion.GetSale(int(pico_id), sale_data)
-            if not exito:
-                continue
-            try:
-                ultimo_sale_number = int(sale_data.GetSaleID())
-            except Exception:
-                ultimo_sale_number = 0
-            if not ultimo_sale_number:
-                continue
-            for sale_number in range(int(ultimo_sale_number), 0, -1):
-                venta = self.obtener_venta(int(pico_id), int(sale_number))
-                if venta:
-                    fecha_venta = venta.get('fecha')
-                    fecha_venta_dt = None
-                    if fecha_venta:
-                        if isinstance(fecha_venta, str) and len(fecha_venta) == 8 and fecha_venta.isdigit():
-                            try:
-                                fecha_venta_dt = datetime.strptime(fecha_venta, "%Y%m%d").date()
-                            except Exception:
-                                fecha_venta_dt = None
-                        else:
-                            try:
-                                fecha_venta_dt = datetime.strptime(str(fecha_venta), "%Y-%m-%d").date()
-                            except Exception:
-                                try:
-                                    fecha_venta_dt = datetime.strptime(str(fecha_venta)[:10], "%Y-%m-%d").date()
-                                except Exception:
-                                    fecha_venta_dt = None
-                        if fecha_venta_dt and fecha_venta_dt != fecha_dia:
-                            continue
-                    clave = venta.get('venta_id')
-                    if clave in ventas_ids:
-                        continue
-                    ventas_ids.add(clave)
-                    if pump_id is not None:
-                        venta['surtidor_id'] = pump_id
-                        venta['pump_id'] = pump_id
-                    if pico_id is not None:
-                        venta['pico_id'] = pico_id
-                    ventas.append(venta)
-        return ventas
+        return super().obtener_ventas_del_dia(hose_id, fecha_dia)
         #self.procesar_ventas_recibidas(ventas, ejecucion_id)
 
 
-
     def procesar_ventas_recibidas(self, ventas, ejecucion_id):
 
-        print(f":: Procesando ventas recibidas ({len(ventas)}), aguarde un momento por favor...")
+        # ventas puede ser el generador de obtener_ventas_del_dia: cada venta se verifica a medida
+        # que se lee del Fusion y las nuevas se insertan por lotes de LOTE_INSERT
+        print(":: Procesando ventas recibidas, aguarde un momento por favor...")
         cuantas = 0
-        if len(ventas) == 0:
+        recibidas = 0
+        filas = []  # Ventas nuevas pendientes de insertar en el próximo lote
+        # Si la lectura del Fusion falla a mitad del recorrido, las ventas ya verificadas e
+        # informadas con grabarRepuesta se insertan igual antes de propagar el error
+        try:
+            for venta in ventas:
+                recibidas += 1
+                fecha_recibida = venta.fecha
+                existe = self.verificarSiExisteVentaYaGrabada(venta.venta_id, venta.surtidor_id, venta.pico_id, venta.fecha)
+
+                if existe == 0 or existe is None:
+                    cuantas = cuantas + 1
+                    self.grabarRepuesta(ejecucion_id,  f"Venta ID: {venta.venta_id}, Pico ID: {venta.pico_id}, Fecha: {venta.fecha}, Importe: {venta.importe}")
+                    print(
+                        f"Venta ID: {venta.venta_id}, Pico ID: {venta.pico_id}, Fecha: {venta.fecha}, Importe: {venta.importe}")
+                    # Formatear fecha y hora correctamente
+                    fecha = venta.fecha
+                    hora = venta.hora
+                    # Si la fecha viene como string tipo 'YYYYMMDD', convertir a 'YYYY-MM-DD'
+                    if fecha and isinstance(fecha, str) and len(fecha) == 8 and fecha.isdigit():
+                        fecha = f"{fecha[:4]}-{fecha[4:6]}-{fecha[6:]}"
+                    # Si la hora viene como string tipo 'HHMMSS', convertir a 'HH:MM:SS'
+                    if hora and isinstance(hora, str) and len(hora) == 6 and hora.isdigit():
+                        hora = f"{hora[:2]}:{hora[2:4]}:{hora[4:]}"
+                    filas.append((
+                        venta.venta_id,
+                        venta.surtidor_id,
+                        venta.pico_id,
+                        venta.volumen,
+                        venta.importe,
+                        venta.precio_unitario,
+                        venta.tipo_pago,
+                        venta.volumen_inicial,
+                        venta.volumen_final,
+                        venta.nivel_precio,
+                        venta.tipo_transaccion,
+                        venta.importe_preset,
+                        venta.turno_id,
+                        venta.producto_id,
+                        venta.nombre_producto,
+                        fecha,
+                        hora
+                    ))
+                    if len(filas) >= LOTE_INSERT:
+                        error = self._grabar_lote(filas, ejecucion_id)
+                        if error:
+                            return error
+        finally:
+            error = self._grabar_lote(filas, ejecucion_id)
+        if error:
+            return error
+        if recibidas == 0:
             self.grabarRepuesta(ejecucion_id, "No se encontraron ventas para el día indicado ")
             print("No se encontraron ventas para el día indicado.")
             return
-        for venta in ventas:
-            existe = self.verificarSiExisteVentaYaGrabada(venta.get('venta_id'), venta.get('surtidor_id'), venta.get('pico_id'), venta.get('fecha'))
-
-            if existe == 0 or existe is None:
-                cuantas = cuantas + 1
-                self.grabarRepuesta(ejecucion_id,  f"Venta ID: {venta.get('venta_id')}, Pico ID: {venta.get('pico_id')}, Fecha: {venta.get('fecha')}, Importe: {venta.get('importe')}")
-                print(
-                    f"Venta ID: {venta.get('venta_id')}, Pico ID: {venta.get('pico_id')}, Fecha: {venta.get('fecha')}, Importe: {venta.get('importe')}")
-                # Formatear fecha y hora correctamente
-                fecha = venta.get('fecha')
-                hora = venta.get('hora')
-                # Si la fecha viene como string tipo 'YYYYMMDD', convertir a 'YYYY-MM-DD'
-                if fecha and isinstance(fecha, str) and len(fecha) == 8 and fecha.isdigit():
-                    fecha = f"{fecha[:4]}-{fecha[4:6]}-{fecha[6:]}"
-                # Si la hora viene como string tipo 'HHMMSS', convertir a 'HH:MM:SS'
-                if hora and isinstance(hora, str) and len(hora) == 6 and hora.isdigit():
-                    hora = f"{hora[:2]}:{hora[2:4]}:{hora[4:]}"
-                insert_sql = """
-                    INSERT INTO fusion_comprobantes (
-                        venta_id, surtidor_id, pico_id, litros, importe, precio_unitario, tipo_pago,
-                        litros_inicial, litros_final, nivel_precio, tipo_transaccion, importe_preset,
-                        turno_id, producto_id, producto_nombre, fecha, hora
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                valores = (
-                    venta.get('venta_id'),
-                    venta.get('surtidor_id'),
-                    venta.get('pico_id'),
-                    venta.get('volumen'),
-                    venta.get('importe'),
-                    venta.get('precio_unitario'),
-                    venta.get('tipo_pago'),
-                    venta.get('volumen_inicial'),
-                    venta.get('volumen_final'),
-                    venta.get('nivel_precio'),
-                    venta.get('tipo_transaccion'),
-                    venta.get('importe_preset'),
-                    venta.get('turno_id'),
-                    venta.get('producto_id'),
-                    venta.get('nombre_producto'),
-                    fecha,
-                    hora
-                )
-                try:
-                    cursor = self.conn.cursor()
-                    cursor.execute(insert_sql, valores)
-                    self.conn.commit()
-
-
-
-                except Exception as e:
-
-                    self.grabarRepuesta(ejecucion_id, "Eror insertando venta en la base de datos: " + str(e))
-                    print(f"Error insertando venta en la base de datos: {e}")
-                    return ejecucion_id, "Eror insertando venta en la base de datos: " + str(e)
-
-
+        print(f":: Ventas recibidas: {recibidas}")
+        # Fecha para los mensajes finales tomada de la última venta recibida: 'fecha' solo
+        # existe si hubo alguna venta nueva
+        fecha = fecha_recibida
+        if fecha and isinstance(fecha, str) and len(fecha) == 8 and fecha.isdigit():
+            fecha = f"{fecha[:4]}-{fecha[4:6]}-{fecha[6:]}"
         if cuantas == 0:
             self.grabarRepuesta(ejecucion_id, "No se encontraron ventas nuevas para procesar en la fecha indicada "+str(fecha))
             print("No se encontraron ventas nuevas para procesar.")
         else:
             self.grabarRepuesta(ejecucion_id, f"Total de ventas procesadas e insertadas: {str(cuantas)}, en la fecha indicada "+str(fecha))
 
+    def _grabar_lote(self, filas, ejecucion_id):
+        # Inserta las filas pendientes con un solo executemany y vacía la lista.
+        # fast_executemany (parámetros en bloque) es propio de los drivers ODBC de Microsoft:
+        # solo se activa si config.ini lo pide con fast_executemany = true en [CONEXION]
+        if not filas:
+            return None
+        try:
+            cursor = self.conn.cursor()
+            if self.fast_executemany:
+                cursor.fast_executemany = True
+            cursor.executemany(INSERT_COMPROBANTE_SQL, filas)
+            self.conn.commit()
+        except Exception as e:
+            self.grabarRepuesta(ejecucion_id, "Eror insertando venta en la base de datos: " + str(e))
+            print(f"Error insertando venta en la base de datos: {e}")
+            return ejecucion_id, "Eror insertando venta en la base de datos: " + str(e)
+        finally:
+            filas.clear()
+        return None
+
     def grabarRepuesta(self, ejecucion_id, mensaje):
         if not hasattr(self, 'conn') or self.conn is None:
             print("No hay conexión a la base de datos para grabar respuesta.")
@@ -305,48 +237,6 @@ class FusionBridge:
             # no existe se puede grabar
             return 0
 
-
-    def imprimir_firma_getsale(self):
-        print("\n--- Firma de Fusion.GetSale ---")
-        print(self.fusion.GetSale.__doc__)
-        print("--- Fin de firma ---\n")
-
-    def listar_productos(self, grados=8):
-        #--accion listar_productos --ip 200.85.107.15
-        productos = []
-        for grado in range(1, int(grados) + 1):
-            nombre = self.leer_producto(grado)
-            if nombre:
-                productos.append((grado, nombre))
-        return productos
-
-    def obtener_ultima_venta(self, hose_id=None):
-        try:
-            fusion_sale = self.FusionSale()
-            if hose_id:
-                exito = self.fusion.GetLastSale(int(hose_id), fusion_sale)
-            else:
-                exito = self.fusion.GetLastSale(fusion_sale)
-            if not exito:
-                return {"error": "No se encontró una venta."}
-            # Extraer todos los campos relevantes según la documentación
-            venta = {
-                "sale_id": fusion_sale.GetSaleID(),
-                "pump_id": fusion_sale.GetPumpNr(),
-                "hose_id": fusion_sale.GetHoseNr(),
-                "grade_id": fusion_sale.GetGradeNr(),
-                "volume": fusion_sale.GetVolume(),
-                "amount": fusion_sale.GetAmount(),
-                "ppu": fusion_sale.GetPPU(),
-                "payment_type": fusion_sale.GetPaymentType(),
-                "fecha": fusion_sale.GetDateOfTransaction(),
-                "hora": fusion_sale.GetTimeOfTransaction(),
-                # Puedes agregar más campos si lo necesitas
-            }
-            return venta
-        except Exception as e:
-            return {"error": f"Error obteniendo la última venta: {e}"}
-
     def diagnostico_picos_bombas(self):
         """
         Diagnóstico: muestra cuántas bombas y picos detecta la DLL y sus IDs reales.
@@ -378,109 +268,43 @@ class FusionBridge:
         except Exception as e:
             print(f"Error en diagnóstico de picos y bombas: {e}")
 
+@accion()
+def _accion_ventas_dia(bridge, args):
+    if args.hose_id is None or not args.fecha_dia:
+        print("Debe indicar --hose_id y --fecha_dia para consultar ventas del día.")
+        sys.exit(1)
+    ventas = bridge.obtener_ventas_del_dia(args.hose_id, args.fecha_dia, args.ejecucion)
+    # procesar_ventas_recibidas informa también el caso sin ventas
+    bridge.procesar_ventas_recibidas(ventas, args.ejecucion)
+
+@accion()
+def _accion_diagnostico_picos_bombas(bridge, args):
+    bridge.diagnostico_picos_bombas()
+
+ACCIONES = {
+    **ACCIONES_COMUNES,
+    'ventas_dia': _accion_ventas_dia,
+    'diagnostico_picos_bombas': _accion_diagnostico_picos_bombas,
+}
+
 def main():
     parser = argparse.ArgumentParser(description="Bridge para FusionClass.dll - Consulta de surtidores")
     parser.add_argument('--dll', type=str, default=os.path.abspath(os.path.join(os.path.dirname(__file__), "FusionClass.dll")), help='Ruta a FusionClass.dll')
     parser.add_argument('--ip', type=str, required=False, help='IP del controlador Fusion')
     parser.add_argument('--hose_id', type=int, help='ID del pico/surtidor para consultar venta')
-    parser.add_argument('--sale_number', type=int, default=0, help='Número de venta a consultar (0=última venta)')
-    parser.add_argument('--accion', type=str, required=True, choices=['leer_producto', 'consultar_metodos', 'ultima_venta', 'venta_especifica', 'ventas_dia', 'listar_productos'], help='Acción a realizar')
+    parser.add_argument('--sale_number', type=int, default=0, help='Número de venta (SaleID) a consultar con venta_especifica')
+    parser.add_argument('--accion', type=str, choices=list(ACCIONES), help='Acción a realizar')
     parser.add_argument('--grado', type=int, help='Número de grado/producto a consultar (1-8)')
     parser.add_argument('--fecha_dia', type=str, help='Fecha para filtrar ventas (YYYY-MM-DD)')
     parser.add_argument('--ejecucion', type=str, help='Nùmero aleatorio para identificar la ejecución en logs')
+    parser.add_argument('--daemon', action='store_true', help='Mantener la DLL cargada y atender pedidos JSON por stdin (uno por línea)')
     args = parser.parse_args()
-
-    try:
-        bridge = FusionBridge(args.dll)
-        if args.accion == 'consultar_metodos':
-            bridge.listar_metodos()
-            bridge.imprimir_firma_getsale()
-            sys.exit(0)
-        if args.accion == 'leer_producto':
-            if not args.ip:
-                print("Debe indicar --ip para conectar.")
-                sys.exit(1)
-            bridge.conectar(args.ip)
-            if args.grado is None:
-                print("Debe indicar --grado para leer un producto.")
-                sys.exit(1)
-            nombre = bridge.leer_producto(args.grado)
-            if nombre:
-                print(f"Producto en grado {args.grado}: {nombre}")
-            else:
-                print(f"No hay producto configurado en grado {args.grado}.")
-        if args.accion == 'ultima_venta':
-            if not args.ip:
-                print("Debe indicar --ip para conectar.")
-                sys.exit(1)
-            bridge.conectar(args.ip)
-            if args.hose_id is None:
-                print("Debe indicar --hose_id para consultar la última venta.")
-                sys.exit(1)
-            venta = bridge.obtener_venta(args.hose_id, 0, args.ejecucion)
-            if venta:
-                print("Datos de la última venta:")
-                for k, v in venta.items():
-                    print(f"{k}: {v}")
-            else:
-                print("No se pudo obtener la última venta para el pico indicado.")
-        if args.accion == 'venta_especifica':
-            if not args.ip:
-                print("Debe indicar --ip para conectar.")
-                sys.exit(1)
-            bridge.conectar(args.ip)
-            if args.hose_id is None or args.sale_number is None:
-                print("Debe indicar --hose_id y --sale_number para consultar una venta específica.")
-                sys.exit(1)
-            venta = bridge.obtener_venta(args.hose_id, args.sale_number, args.ejecucion)
-            if venta:
-                print(f"Datos de la venta sale_number={args.sale_number}:")
-                for k, v in venta.items():
-                    print(f"{k}: {v}")
-            else:
-                print("No se pudo obtener la venta para el pico y número indicados.")
-        if args.accion == 'ventas_dia':
-            if not args.ip:
-                print("Debe indicar --ip para conectar.")
-                sys.exit(1)
-            bridge.conectar(args.ip)
-            if args.hose_id is None or not args.fecha_dia:
-                print("Debe indicar --hose_id y --fecha_dia para consultar ventas del día.")
-                sys.exit(1)
-            ventas = bridge.obtener_ventas_del_dia(args.hose_id, args.fecha_dia, args.ejecucion)
-            if ventas:
-                #print(f"Ventas del día {args.fecha_dia} para hose_id={args.hose_id}:")
-                #for venta in ventas:
-                    #logging.info(venta)
-                bridge.procesar_ventas_recibidas(ventas, args.ejecucion)
-               #
-
-            else:
-               bridge.grabarRepuesta(args.ejecucion, "No se encontraron ventas para el día "+args.fecha_dia)
-               print("No se encontraron ventas para el dìa ."+args.fecha_dia)
-        if args.accion == 'listar_productos':
-            if not args.ip:
-                print("Debe indicar --ip para conectar.")
-                sys.exit(1)
-            bridge.conectar(args.ip)
-            productos = bridge.listar_productos()
-            if productos:
-                print("Productos configurados:")
-                for grado, nombre in productos:
-                    print(f"Grado {grado}: {nombre}")
-            else:
-                print("No se encontraron productos configurados.")
-            sys.exit(0)
-        if args.accion == 'diagnostico_picos_bombas':
-            if not args.ip:
-                print("Debe indicar --ip para conectar.")
-                sys.exit(1)
-            bridge.conectar(args.ip)
-            bridge.diagnostico_picos_bombas()
-            sys.exit(0)
-    except Exception as e:
-        print(f"Error: {e}")
-        sys.exit(1)
+    if args.daemon:
+        ejecutar_daemon(FusionBridgeSybase, parser, args, ACCIONES)
+    elif not args.accion:
+        parser.error("Debe indicar --accion (o --daemon)")
+    else:
+        ejecutar_accion(FusionBridgeSybase, args, ACCIONES)
 
 if __name__ == "__main__":
     main()
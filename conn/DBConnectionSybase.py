@@ -1,12 +1,48 @@
 import pyodbc
 import configparser
 import os
+import queue
 import sys
 
+# Datos de config.ini: se leen una sola vez por proceso (ver _leer_config)
+_CONFIG = None
+
+def _leer_config():
+    global _CONFIG
+    if _CONFIG is not None:
+        return _CONFIG
+    # Buscar config.ini en el mismo directorio que el ejecutable o el script
+    if getattr(sys, 'frozen', False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    config_path = os.path.join(base_path, '../config.ini')
+    print(f"[DEBUG] Buscando config.ini en: {config_path}")
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"No se encontró config.ini en {config_path}")
+    config = configparser.ConfigParser()
+    read_files = config.read(config_path)
+    if not read_files:
+        raise FileNotFoundError(f"No se pudo leer config.ini en {config_path}")
+    _CONFIG = {
+        'serv': config['CONEXION']['serv'],
+        'usr': config['CONEXION']['usr'],
+        'passwd': config['CONEXION']['passwd'],
+        'db': config['CONEXION']['db'],
+        'prt': config['CONEXION']['prt'],
+        'nombreCliente': config['EMPRESA']['nombre'],
+        'token': config['TOKEN']['TOKEN'],
+    }
+    return _CONFIG
+
 class DBConnectionSybase:
+    # Conexiones ya abiertas y devueltas con release(): una instancia nueva toma una de acá
+    # en lugar de volver a conectar (handshake + autenticación contra Sybase)
+    _pool = queue.LifoQueue()
+
     def __init__(self):
         try:
-            self.conn = self.create_connection()
+            self.conn = self.acquire()
         except pyodbc.Error as e:
             print("Error al conectar a la base de datos:", e)
             self.conn = None
@@ -17,38 +53,51 @@ class DBConnectionSybase:
             print("Error inesperado:", e)
             self.conn = None
 
-    def create_connection(self):
-        # Buscar config.ini en el mismo directorio que el ejecutable o el script
-        if getattr(sys, 'frozen', False):
-            base_path = os.path.dirname(sys.executable)
-        else:
-            base_path = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(base_path, '../config.ini')
-        print(f"[DEBUG] Buscando config.ini en: {config_path}")
-        print(f"[DEBUG] Archivos en {base_path}: {os.listdir(base_path)}")
-        if not os.path.exists(config_path):
-            raise FileNotFoundError(f"No se encontró config.ini en {config_path}")
-        config = configparser.ConfigParser()
-        read_files = config.read(config_path)
-        if not read_files:
-            raise FileNotFoundError(f"No se pudo leer config.ini en {config_path}")
-        self.serv = config['CONEXION']['serv']
-        self.usr = config['CONEXION']['usr']
-        self.passwd = config['CONEXION']['passwd']
-        self.db = config['CONEXION']['db']
-        self.prt = config['CONEXION']['prt']
-        self.nombreCliente = config['EMPRESA']['nombre']
-        self.token = config['TOKEN']['TOKEN']
-        """
-         print("--> "+self.serv)
-        print("--> "+self.passwd)
-        print("--> "+self.db)
-        print("--> "+self.prt)
-        print("--> "+self.nombreCliente)
-        print("--> "+self.usr)
-        print("--> "+self.token)
-         """
-        conn = pyodbc.connect('DSN=' + self.serv + ';Database=' + self.db + ';UID=' + self.usr + ';PWD=' + self.passwd, autocommit=True)
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def acquire(self):
+        config = _leer_config()
+        self.serv = config['serv']
+        self.usr = config['usr']
+        self.passwd = config['passwd']
+        self.db = config['db']
+        self.prt = config['prt']
+        self.nombreCliente = config['nombreCliente']
+        self.token = config['token']
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                return self.create_connection(config)
+            if not getattr(conn, 'closed', False) and self._conexion_viva(conn):
+                return conn
+
+    @staticmethod
+    def _conexion_viva(conn):
+        # closed solo refleja un close() local: una conexión que Sybase cortó se detecta
+        # con una consulta mínima; si falla se descarta y se prueba la siguiente
+        try:
+            conn.cursor().execute("SELECT 1").fetchone()
+            return True
+        except pyodbc.Error:
+            try:
+                conn.close()
+            except pyodbc.Error:
+                pass
+            return False
+
+    def release(self):
+        # Devuelve la conexión al pool para la próxima instancia
+        if self.conn is not None and not getattr(self.conn, 'closed', False):
+            self._pool.put(self.conn)
+        self.conn = None
+
+    def create_connection(self, config):
+        conn = pyodbc.connect('DSN=' + config['serv'] + ';Database=' + config['db'] + ';UID=' + config['usr'] + ';PWD=' + config['passwd'], autocommit=True)
         conn.setdecoding(pyodbc.SQL_CHAR, encoding='latin1')
         conn.setencoding('latin1')
 
@@ -0,0 +1,511 @@
+import os
+import sys
+import abc
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import operator
+import time
+from datetime import date, datetime
+try:
+    import clr  # pythonnet
+except ImportError:
+    raise ImportError("pythonnet debe estar instalado en el entorno. Instala con: pip install pythonnet")
+
+# Lógica común de acceso a FusionClass.dll para bridge.py (Sybase) y bridge-respa.py
+
+# Campos leídos de FusionSale: (campo, getters en orden de preferencia, atributo de respaldo, valor por defecto)
+CAMPOS_VENTA = (
+    ('nro_comp', ('GetSaleID',), 'SaleId', 0),
+    ('litros', ('GetVolume',), 'Volume', 0),
+    ('monto', ('GetAmount',), 'Amount', 0),
+    ('producto', ('GetProduct', 'GetGradeNr'), 'Product', 0),
+    ('fecha', ('GetDateOfTransaction',), 'DateTime', None),
+    ('pico', ('GetHoseNr',), 'HoseNr', None),
+)
+
+def _parsear_fecha_venta(fecha_venta):
+    # Fecha de FusionSale ('YYYYMMDD' o 'YYYY-MM-DD...') a date; None si no se puede interpretar
+    if not fecha_venta:
+        return None
+    if isinstance(fecha_venta, str):
+        if len(fecha_venta) == 8 and fecha_venta.isdigit():
+            # Caso habitual de GetDateOfTransaction: partes por posición, sin strptime
+            try:
+                return date(int(fecha_venta[:4]), int(fecha_venta[4:6]), int(fecha_venta[6:]))
+            except ValueError:
+                return None
+        try:
+            return date.fromisoformat(fecha_venta[:10])
+        except Exception:
+            return None
+    # datetime/date de Python o System.DateTime de .NET: se toman sus partes directamente,
+    # sin pasar por str() (ToString() del lado .NET) y strptime
+    if isinstance(fecha_venta, datetime):
+        return fecha_venta.date()
+    if isinstance(fecha_venta, date):
+        return fecha_venta
+    try:
+        return date(fecha_venta.Year, fecha_venta.Month, fecha_venta.Day)
+    except Exception:
+        return None
+
+def _clave_fecha_venta(fecha_venta):
+    # Fecha de FusionSale como entero YYYYMMDD, para comparar en el recorrido sin armar
+    # objetos date; None si no se puede interpretar
+    if isinstance(fecha_venta, str) and len(fecha_venta) == 8 and fecha_venta.isdigit():
+        # Caso habitual de GetDateOfTransaction: el texto ya es la clave
+        return int(fecha_venta)
+    fecha = _parsear_fecha_venta(fecha_venta)
+    if fecha is None:
+        return None
+    return fecha.year * 10000 + fecha.month * 100 + fecha.day
+
+def _resolver_campo(probe, metodos, atributo, defecto):
+    # Devuelve una única función de lectura para el campo: el primer getter que exista
+    # en FusionSale o, si no hay ninguno, el atributo de respaldo con su valor por defecto
+    metodo = next((m for m in metodos if hasattr(probe, m)), None)
+    if metodo:
+        return operator.methodcaller(metodo)
+    return lambda sale_data: getattr(sale_data, atributo, defecto)
+
+# Getters por campo, por tipo FusionSale y tabla de campos: los hasattr sobre el wrapper
+# de pythonnet se hacen una sola vez por proceso aunque se creen varios bridges
+_GETTERS_POR_TIPO = {}
+
+def _getters_de_venta(tipo_sale, campos):
+    getters = _GETTERS_POR_TIPO.get((tipo_sale, campos))
+    if getters is None:
+        probe = tipo_sale()
+        getters = {
+            campo: _resolver_campo(probe, metodos, atributo, defecto)
+            for campo, metodos, atributo, defecto in campos
+        }
+        _GETTERS_POR_TIPO[(tipo_sale, campos)] = getters
+    return getters
+
+# (Fusion, FusionSale) por ruta absoluta de la DLL: AddReference + import se hacen una sola vez
+# por proceso aunque se creen varios bridges (modo --daemon)
+_FUSION_POR_DLL = {}
+
+def _cargar_fusion(dll_path):
+    dll_path = os.path.abspath(dll_path)
+    tipos = _FUSION_POR_DLL.get(dll_path)
+    if tipos is not None:
+        return tipos
+    if not os.path.exists(dll_path):
+        raise FileNotFoundError(f"No se encuentra la DLL en {dll_path}")
+    # Usar AddReference solo si está disponible
+    if hasattr(clr, 'AddReference'):
+        clr.AddReference(dll_path)
+    else:
+        raise ImportError("No se encontró 'AddReference' en clr. Actualiza pythonnet >= 3.x y elimina cualquier archivo clr.py local.")
+    fusion_mod = importlib.import_module('FusionClass')
+    tipos = (getattr(fusion_mod, 'Fusion'), getattr(fusion_mod, 'FusionSale'))
+    _FUSION_POR_DLL[dll_path] = tipos
+    return tipos
+
+# Miembros públicos por tipo .NET, para listar_metodos
+_METODOS_POR_TIPO = {}
+
+class FusionBridge(abc.ABC):
+    # Cada variante define cómo se arma una venta (_armar_venta_desde_sale)
+    # y agrega sus propias acciones; el acceso a la DLL y el recorrido de ventas es común
+    CAMPOS_VENTA = CAMPOS_VENTA
+
+    def __init__(self, dll_path):
+        self.Fusion, self.FusionSale = _cargar_fusion(dll_path)
+        self._nueva_instancia()
+        # Nombre de producto por grado (solo los leídos con éxito); la configuración de grados
+        # no cambia durante la ejecución
+        self._grade_cache = {}
+        self._firma_getsale = None
+        # Resolver una sola vez qué getter expone FusionSale para cada campo,
+        # en vez de probar con try/except AttributeError en cada venta
+        self._getters_venta = _getters_de_venta(self.FusionSale, self.CAMPOS_VENTA)
+        self._venta_desde_sale = self._armar_venta_desde_sale()
+
+    def _nueva_instancia(self):
+        self.fusion = self.Fusion()
+        # Métodos de Fusion usados en los recorridos, resueltos una sola vez por instancia: cada
+        # self.fusion.GetSale es una búsqueda de atributo en el wrapper de pythonnet
+        self._get_sale = self.fusion.GetSale
+        self._get_last_sale = self.fusion.GetLastSale
+
+    def _leer_campo(self, sale_data, campo):
+        return self._getters_venta[campo](sale_data)
+
+    def cerrar(self):
+        # Fusion expone Close (no Disconnect/Dispose)
+        try:
+            self.fusion.Close()
+        except Exception as e:
+            print(f"Error al cerrar la conexión con Fusion: {e}")
+
+    def reconectar(self, ip, timeout=2.0):
+        # Cierra la instancia actual y conecta una nueva, en vez de volver a llamar a Connection()
+        # sobre una instancia que la DLL puede estar reconectando. Los nombres de producto en
+        # caché pueden ser de otro controlador: se descartan
+        self.cerrar()
+        self._nueva_instancia()
+        self.invalidar_cache_productos()
+        return self.conectar(ip, timeout)
+
+    def conectar(self, ip, timeout=2.0):
+        # En lugar de dormir siempre 2 s, esperar con reintentos crecientes (hasta el mismo
+        # máximo de 2 s) a que la DLL informe la conexión y además tenga los datos del
+        # controlador: después de conectar todavía los pide y procesa (~1,5 s). Devuelve True
+        # si quedó conectado
+        self.fusion.Connection(ip)
+        limite = time.monotonic() + timeout
+        espera = 0.02
+        while time.monotonic() < limite:
+            if self._datos_disponibles():
+                return True
+            time.sleep(min(espera, max(limite - time.monotonic(), 0)))
+            espera = min(espera * 2, 0.25)
+        try:
+            return bool(self.fusion.ConnectionStatus())
+        except Exception:
+            return False
+
+    def _datos_disponibles(self):
+        # Conectado y con la configuración ya cargada: GetGrade(1) responde
+        try:
+            if not self.fusion.ConnectionStatus():
+                return False
+            exito, nombre_res = self.fusion.GetGrade(1, "")
+        except Exception:
+            return False
+        if exito:
+            self._grade_cache[1] = nombre_res
+        return bool(exito)
+
+    def leer_producto(self, grado):
+        if grado in self._grade_cache:
+            return self._grade_cache[grado]
+        nombre_temp = ""
+        exito, nombre_res = self.fusion.GetGrade(grado, nombre_temp)
+        if not exito:
+            # No se guarda: puede ser que la DLL todavía no haya cargado los datos
+            return None
+        self._grade_cache[grado] = nombre_res
+        return nombre_res
+
+    def invalidar_cache_productos(self):
+        # Usar si se cambia la configuración de grados en el controlador durante la sesión
+        self._grade_cache.clear()
+
+    def listar_metodos(self):
+        # dir() sobre un objeto .NET recorre por reflexión todos los miembros del tipo:
+        # se hace una sola vez por tipo y se imprime todo en una sola escritura
+        tipo = type(self.fusion)
+        metodos = _METODOS_POR_TIPO.get(tipo)
+        if metodos is None:
+            metodos = tuple(m for m in dir(self.fusion) if not m.startswith('_'))
+            _METODOS_POR_TIPO[tipo] = metodos
+        sys.stdout.write("\n--- Métodos públicos de Fusion ---\n" + "".join(m + "\n" for m in metodos) + "--- Fin de métodos ---\n\n")
+
+    def obtener_venta(self, sale_number):
+        # GetSale recibe el SaleID (único en todo el controlador), no el pico
+        sale_data = self.FusionSale()
+        if self._get_sale(sale_number, sale_data):
+            return self._venta_desde_sale(sale_data)
+        return None
+
+    def obtener_ultima_venta(self, surtidor=None):
+        # Última venta del surtidor (bomba) indicado con GetLastSale(bomba, venta),
+        # o la última del controlador con GetLastSale(venta) si no se indica
+        sale_data = self.FusionSale()
+        if surtidor:
+            exito = self._get_last_sale(int(surtidor), sale_data)
+        else:
+            exito = self._get_last_sale(sale_data)
+        if exito:
+            return self._venta_desde_sale(sale_data)
+        return None
+
+    def campos_venta(self, venta):
+        # Pares (campo, valor) de una venta armada por esta variante, para mostrarla;
+        # las variantes que no devuelven un dict lo redefinen
+        return venta.items()
+
+    @abc.abstractmethod
+    def _armar_venta_desde_sale(self):
+        # Devuelve la función que arma la venta a partir de un FusionSale ya completado
+        # por GetSale/GetLastSale; se llama una vez, al final de __init__
+        ...
+
+    def obtener_picos(self):
+        hoses = []
+        try:
+            config = self.fusion.GetConfig()
+            # Sin dir()/print acá: la estructura de config se inspecciona con la acción
+            # diagnostico_picos_bombas; ajustar según lo que muestre
+            # for pump in config.Pumps:
+            #     for hose in pump.Hoses:
+            #         hoses.append(hose.HoseNr)
+        except Exception as e:
+            print(f"Error obteniendo hoses: {e}")
+        return hoses
+
+    def obtener_ventas_del_dia(self, hose_id, fecha_dia):
+        # Generador: cada venta se entrega apenas se lee, sin acumular el día en memoria
+        if isinstance(fecha_dia, str):
+            fecha_dia = date.fromisoformat(fecha_dia)
+        # Las fechas se comparan como enteros YYYYMMDD
+        clave_dia = fecha_dia.year * 10000 + fecha_dia.month * 100 + fecha_dia.day
+        pico_filtro = int(hose_id) if hose_id and int(hose_id) > 0 else None
+
+        # Los SaleID son únicos en todo el controlador: se recorren una sola vez,
+        # desde la última venta hacia atrás, y se filtra por pico sobre cada venta
+        # (antes se hacía un recorrido completo por cada uno de los 21 picos).
+        # Como cada SaleID se lee una única vez, no hace falta controlar duplicados.
+        get_sale = self._get_sale
+        leer_fecha = self._getters_venta['fecha']
+        leer_pico = self._getters_venta['pico']
+        sale_data = self.FusionSale()
+        if not self._get_last_sale(sale_data):
+            return
+        try:
+            ultimo_sale_number = int(self._leer_campo(sale_data, 'nro_comp'))
+        except Exception:
+            ultimo_sale_number = 0
+        # SaleID con el que ya está completado sale_data: la última venta, que trajo GetLastSale
+        # y no hace falta volver a pedir con GetSale
+        sale_number_cargado = ultimo_sale_number
+        # Si la última venta ya es posterior al día pedido, se ubica por búsqueda binaria
+        # la última venta de ese día en vez de recorrer una a una todas las posteriores
+        clave_ultima = _clave_fecha_venta(leer_fecha(sale_data))
+        if clave_ultima and clave_ultima > clave_dia:
+            ultimo_sale_number = self._buscar_ultima_venta_hasta(clave_dia, ultimo_sale_number, sale_data)
+            sale_number_cargado = None
+
+        # Se reutiliza el mismo FusionSale en todo el recorrido: GetSale lo completa en
+        # cada llamada y los valores se copian a la venta antes de la siguiente
+        for sale_number in range(ultimo_sale_number, 0, -1):
+            if sale_number != sale_number_cargado:
+                # GetSale puede lanzar excepción para un SaleID inexistente (ventas purgadas
+                # por el controlador): se saltea igual que si devolviera False
+                try:
+                    if not get_sale(sale_number, sale_data):
+                        continue
+                except Exception:
+                    continue
+            # Primero solo fecha y pico: la venta completa se arma solo para las que se devuelven
+            clave_venta = _clave_fecha_venta(leer_fecha(sale_data))
+            if clave_venta and clave_venta < clave_dia:
+                # Los SaleID crecen con el tiempo: el resto de las ventas son de días anteriores
+                break
+            if clave_venta and clave_venta != clave_dia:
+                continue
+            if pico_filtro is not None and leer_pico(sale_data) != pico_filtro:
+                continue
+            venta = self._venta_desde_sale(sale_data)
+            if venta is not None:
+                yield venta
+
+    def _buscar_ultima_venta_hasta(self, clave_dia, ultimo_sale_number, sale_data):
+        # Mayor SaleID con fecha <= clave_dia (YYYYMMDD) (0 si no hay ninguno). Los SaleID crecen con el
+        # tiempo, así que alcanzan ~log2(N) llamadas a GetSale. Una venta que no se puede leer
+        # (GetSale devuelve False o lanza excepción) se toma como anterior o igual al día: el
+        # controlador purga las más viejas, y a lo sumo el recorrido lineal arranca más arriba
+        # (las posteriores al día las saltea). Si una venta no trae fecha, se devuelve la última
+        # para hacer el recorrido completo.
+        get_sale = self._get_sale
+        leer_fecha = self._getters_venta['fecha']
+        bajo, alto = 1, ultimo_sale_number
+        encontrado = 0
+        while bajo <= alto:
+            medio = (bajo + alto) // 2
+            try:
+                leida = get_sale(medio, sale_data)
+            except Exception:
+                leida = False
+            if not leida:
+                encontrado = medio
+                bajo = medio + 1
+                continue
+            clave_venta = _clave_fecha_venta(leer_fecha(sale_data))
+            if clave_venta is None:
+                return ultimo_sale_number
+            if clave_venta <= clave_dia:
+                encontrado = medio
+                bajo = medio + 1
+            else:
+                alto = medio - 1
+        return encontrado
+
+    def imprimir_firma_getsale(self):
+        # El __doc__ de un método .NET se arma por reflexión sobre sus sobrecargas: se lee una sola vez
+        if self._firma_getsale is None:
+            self._firma_getsale = self.fusion.GetSale.__doc__
+        print("\n--- Firma de Fusion.GetSale ---")
+        print(self._firma_getsale)
+        print("--- Fin de firma ---\n")
+
+    def listar_productos(self, grados=8):
+        #--accion listar_productos --ip 200.85.107.15
+        productos = []
+        for grado in range(1, int(grados) + 1):
+            nombre = self.leer_producto(grado)
+            if nombre:
+                productos.append((grado, nombre))
+        return productos
+
+def accion(necesita_ip=True):
+    # Marca un handler de --accion; los que necesitan IP reciben el bridge ya conectado
+    def decorador(fn):
+        fn.necesita_ip = necesita_ip
+        return fn
+    return decorador
+
+@accion(necesita_ip=False)
+def accion_consultar_metodos(bridge, args):
+    bridge.listar_metodos()
+    bridge.imprimir_firma_getsale()
+
+@accion()
+def accion_leer_producto(bridge, args):
+    if args.grado is None:
+        print("Debe indicar --grado para leer un producto.")
+        sys.exit(1)
+    nombre = bridge.leer_producto(args.grado)
+    if nombre:
+        print(f"Producto en grado {args.grado}: {nombre}")
+    else:
+        print(f"No hay producto configurado en grado {args.grado}.")
+
+@accion()
+def accion_ultima_venta(bridge, args):
+    if args.hose_id is None:
+        print("Debe indicar --hose_id para consultar la última venta.")
+        sys.exit(1)
+    venta = bridge.obtener_ultima_venta(args.hose_id)
+    if venta:
+        print("Datos de la última venta:")
+        for k, v in bridge.campos_venta(venta):
+            print(f"{k}: {v}")
+    else:
+        print("No se pudo obtener la última venta para el surtidor indicado.")
+
+@accion()
+def accion_venta_especifica(bridge, args):
+    if not args.sale_number:
+        print("Debe indicar --sale_number para consultar una venta específica.")
+        sys.exit(1)
+    venta = bridge.obtener_venta(args.sale_number)
+    if venta:
+        print(f"Datos de la venta sale_number={args.sale_number}:")
+        for k, v in bridge.campos_venta(venta):
+            print(f"{k}: {v}")
+    else:
+        print("No se pudo obtener la venta con el número indicado.")
+
+@accion()
+def accion_listar_productos(bridge, args):
+    productos = bridge.listar_productos()
+    if productos:
+        print("Productos configurados:")
+        for grado, nombre in productos:
+            print(f"Grado {grado}: {nombre}")
+    else:
+        print("No se encontraron productos configurados.")
+
+# Acciones que comparten ambos scripts; cada uno agrega las suyas
+ACCIONES = {
+    'leer_producto': accion_leer_producto,
+    'consultar_metodos': accion_consultar_metodos,
+    'ultima_venta': accion_ultima_venta,
+    'venta_especifica': accion_venta_especifica,
+    'listar_productos': accion_listar_productos,
+}
+
+def ejecutar_accion(bridge_cls, args, acciones):
+    try:
+        bridge = bridge_cls(args.dll)
+        fn = acciones[args.accion]
+        if fn.necesita_ip:
+            if not args.ip:
+                print("Debe indicar --ip para conectar.")
+                sys.exit(1)
+            bridge.conectar(args.ip)
+        fn(bridge, args)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+def _argumentos_pedido(pedido):
+    # Pedido JSON a argumentos de línea de comandos, para validarlo con el mismo parser
+    # (tipos y choices) que una ejecución normal
+    argumentos = []
+    for clave, valor in pedido.items():
+        if valor is None or valor is False:
+            continue
+        argumentos.append(f"--{clave}")
+        if valor is not True:
+            argumentos.append(str(valor))
+    return argumentos
+
+def ejecutar_daemon(bridge_cls, parser, args, acciones):
+    # Modo --daemon: la DLL se carga una sola vez y se atienden pedidos JSON por stdin, uno por
+    # línea, con los mismos nombres que los argumentos de la línea de comandos, por ejemplo
+    # {"accion": "ventas_dia", "ip": "10.0.0.5", "hose_id": 0, "fecha_dia": "2026-01-06"}.
+    # Cada pedido pasa por el parser; lo que no indica se toma de la línea de comandos del daemon.
+    # Por cada pedido se escribe una línea JSON {"ok": ..., "salida": ...} con lo que imprimió la acción.
+    try:
+        bridge = bridge_cls(args.dll)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    ip_conectada = None
+    # Si la instancia de Fusion ya se conectó alguna vez, un cambio de IP o un reintento la reemplaza
+    instancia_usada = False
+    for linea in sys.stdin:
+        linea = linea.strip()
+        if not linea:
+            continue
+        salida = io.StringIO()
+        ok = True
+        try:
+            pedido = json.loads(linea)
+            if not isinstance(pedido, dict):
+                raise ValueError("El pedido debe ser un objeto JSON")
+            # Los errores del parser (uso y mensaje) van a la respuesta, no a stderr
+            with contextlib.redirect_stderr(salida):
+                args_pedido = parser.parse_args(_argumentos_pedido(pedido), argparse.Namespace(**vars(args)))
+            fn = acciones.get(args_pedido.accion)
+            if fn is None:
+                raise ValueError(f"Acción desconocida: {args_pedido.accion}")
+            with contextlib.redirect_stdout(salida):
+                if fn.necesita_ip:
+                    if not args_pedido.ip:
+                        print("Debe indicar --ip para conectar.")
+                        sys.exit(1)
+                    # La conexión se mantiene entre pedidos mientras no cambie la IP. La IP se
+                    # recuerda solo si la conexión quedó establecida, así el próximo pedido
+                    # vuelve a intentar con una instancia nueva
+                    if args_pedido.ip != ip_conectada:
+                        ip_conectada = None
+                        if instancia_usada:
+                            conectado = bridge.reconectar(args_pedido.ip)
+                        else:
+                            conectado = bridge.conectar(args_pedido.ip)
+                            instancia_usada = True
+                        if conectado:
+                            ip_conectada = args_pedido.ip
+                fn(bridge, args_pedido)
+        except SystemExit as e:
+            ok = not e.code
+        except Exception as e:
+            ok = False
+            salida.write(f"Error: {e}\n")
+        sys.stdout.write(json.dumps({'ok': ok, 'salida': salida.getvalue()}, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+    # Fin de stdin: se cierra la conexión; un error al cerrar va a stderr para no mezclarse
+    # con las respuestas JSON
+    if instancia_usada:
+        with contextlib.redirect_stdout(sys.stderr):
+            bridge.cerrar()
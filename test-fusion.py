@@ -1,61 +1,112 @@
 import clr
-import os
+import functools
+import importlib
+import pathlib
+import sys
+import threading
 import time
 
 # 1. Referenciar la DLL
 # Ajusta la ruta a la ubicación real de FusionClass.dll
-dll_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "FusionClass.dll"))
-if not os.path.exists(dll_path):
-    print(f"ERROR: No se encuentra la DLL en {dll_path}")
-    exit()
+DLL_PATH = pathlib.Path(__file__).resolve().with_name("FusionClass.dll")
 
-try:
-    clr.AddReference(dll_path)
+@functools.lru_cache(maxsize=1)
+def _cargar_fusion():
+    # Verifica la DLL y carga la clase Fusion (namespace FusionClass) una sola vez por proceso;
+    # si falla, la excepción se propaga y no queda en caché
+    if not DLL_PATH.is_file():
+        raise FileNotFoundError(f"No se encuentra la DLL en {DLL_PATH}")
+    clr.AddReference(str(DLL_PATH))
+    return getattr(importlib.import_module('FusionClass'), 'Fusion')
+
+# Instancia de Fusion compartida, reutilizada entre llamadas mientras se pida la misma IP
+_FUSION = None
+_FUSION_IP = None
+_FUSION_LOCK = threading.Lock()
+
+def _datos_disponibles(fusion):
+    # Conectado y con los datos del controlador ya procesados por la DLL: GetGrade(1) responde
+    try:
+        return bool(fusion.ConnectionStatus()) and bool(fusion.GetGrade(1, "")[0])
+    except Exception:
+        return False
+
+def _cerrar(fusion):
+    # Fusion expone Close (no Disconnect/Dispose)
     try:
-        from FusionClass import Fusion
-        print("DLL cargada correctamente con 'from FusionClass import Fusion'.")
-    except ImportError:
-        try:
-            from Fusion import Fusion
-            print("DLL cargada correctamente con 'from Fusion import Fusion'.")
-        except ImportError:
-            # Acceso alternativo usando getattr
-            import sys
-            fusion_mod = sys.modules.get('FusionClass')
-            if fusion_mod:
-                Fusion = getattr(fusion_mod, 'Fusion', None)
-                if Fusion:
-                    print("DLL cargada correctamente usando getattr.")
-                else:
-                    print("No se pudo acceder a la clase Fusion.")
-                    exit()
-            else:
-                print("No se pudo importar FusionClass ni Fusion.")
-                exit()
-except Exception as e:
-    print(f"Error al cargar la DLL o importar Fusion: {e}")
-    print("Asegúrate de tener instalado 'Visual Studio 2013 Redistributable' (Requisito pág 6)")
-    exit()
-
-# 2. Intentar conexión
-c_fusion = Fusion()
-ip_test = "200.85.107.15"
-
-print(f"Conectando a Fusion en {ip_test}...")
-c_fusion.Connection(ip_test)
-
-# Esperar un momento para que la conexión se establezca
-time.sleep(2)
-
-# 3. Probar lectura de Grados (Productos)
-print("\n--- Listado de Productos en Fusion ---")
-for i in range(1, 9):
-    nombre_temp = ""
-    # El método GetGrade devuelve una tupla en PythonNet (Booleano, String)
-    exito, nombre_res = c_fusion.GetGrade(i, nombre_temp)
-    if exito:
-        print(f"ID {i}: {nombre_res}")
-    else:
-        print(f"ID {i}: No configurado")
-
-print("\nPrueba finalizada. Si ves los nombres de productos arriba, ¡estás conectado!")
+        fusion.Close()
+    except Exception as e:
+        print(f"Error al cerrar la conexión con Fusion: {e}")
+
+def obtener_fusion(ip, timeout=2.0):
+    global _FUSION, _FUSION_IP
+    with _FUSION_LOCK:
+        # Misma IP: se reutiliza aunque figure desconectada, la DLL reconecta sola
+        if _FUSION is not None and _FUSION_IP == ip:
+            return _FUSION
+        # Otra IP: se cierra la instancia anterior antes de reemplazarla
+        if _FUSION is not None:
+            _cerrar(_FUSION)
+            _FUSION, _FUSION_IP = None, None
+        fusion = _cargar_fusion()()
+        fusion.Connection(ip)
+        # En lugar de esperar siempre 2 s, consultar hasta ese mismo máximo, con esperas
+        # crecientes (20 ms, 40 ms, ... hasta 250 ms), hasta que la conexión esté arriba y la
+        # DLL ya tenga los datos del controlador (los pide y procesa después de conectar)
+        limite = time.monotonic() + timeout
+        espera = 0.02
+        while not _datos_disponibles(fusion):
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            time.sleep(min(espera, restante))
+            espera = min(espera * 2, 0.25)
+        _FUSION, _FUSION_IP = fusion, ip
+        return fusion
+
+def cerrar_fusion():
+    # Cierra la conexión de la instancia compartida
+    global _FUSION, _FUSION_IP
+    with _FUSION_LOCK:
+        fusion, _FUSION, _FUSION_IP = _FUSION, None, None
+    if fusion is not None:
+        _cerrar(fusion)
+
+def main():
+    try:
+        _cargar_fusion()
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        return 1
+    except Exception as e:
+        print(f"Error al cargar la DLL o importar Fusion: {e}")
+        print("Asegúrate de tener instalado 'Visual Studio 2013 Redistributable' (Requisito pág 6)")
+        return 1
+    print("DLL cargada correctamente.")
+
+    # 2. Intentar conexión
+    ip_test = "200.85.107.15"
+
+    print(f"Conectando a Fusion en {ip_test}...")
+    c_fusion = obtener_fusion(ip_test)
+    try:
+        # 3. Probar lectura de Grados (Productos)
+        print("\n--- Listado de Productos en Fusion ---")
+        # Segundo argumento de GetGrade (ref string): solo ocupa el lugar, el nombre vuelve en la
+        # tupla. No se puede omitir por ser ref; se usa el mismo valor en todas las llamadas
+        nombre_temp = ""
+        # El método GetGrade devuelve una tupla en PythonNet (Booleano, String)
+        resultados = [c_fusion.GetGrade(i, nombre_temp) for i in range(1, 9)]
+        # El listado se arma con un solo join y se escribe de una vez, en vez de un print por grado
+        sys.stdout.write("\n".join(
+            f"ID {i}: {nombre_res}" if exito else f"ID {i}: No configurado"
+            for i, (exito, nombre_res) in enumerate(resultados, 1)
+        ) + "\n")
+
+        print("\nPrueba finalizada. Si ves los nombres de productos arriba, ¡estás conectado!")
+    finally:
+        cerrar_fusion()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())